@@ -0,0 +1,76 @@
+"""Throughput of crowd variants compared to the full pipeline for each character.
+
+Run inside Blender with MPFB and mpfb_to_unity enabled:
+
+    blender --background --python benchmarks/crowd_variants.py -- [variants count]
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import bpy
+
+_MACROS = ("gender", "age", "muscle", "weight", "height", "proportions")
+
+
+def main(variants_count):
+    with tempfile.TemporaryDirectory() as output_directory:
+        start = time.perf_counter()
+        _create_rigify_human("Baseline")
+        bpy.ops.mtu.bake_mesh_for_unity()
+        _select_hierarchy(bpy.data.objects["Baseline"])
+        bpy.ops.mtu.export_unity_fbx(
+            filepath=os.path.join(output_directory, "Baseline.fbx"), use_selection=True
+        )
+        human_duration = time.perf_counter() - start
+
+        _create_rigify_human("Template")
+        variants_file = os.path.join(output_directory, "variants.json")
+        _write_variants(variants_file, variants_count)
+
+        scene = bpy.context.scene
+        scene.mtu_crowd_variants_variants_file = variants_file
+        scene.mtu_crowd_variants_output_directory = output_directory
+
+        start = time.perf_counter()
+        bpy.ops.mtu.generate_crowd_variants()
+        variants_duration = time.perf_counter() - start
+
+    variant_duration = variants_duration / variants_count
+    print(f"Full pipeline: {human_duration:.2f}s")
+    print(
+        f"Variants: {variants_count} in {variants_duration:.2f}s, "
+        f"{variant_duration:.2f}s per variant, {variants_count / variants_duration:.2f} per second"
+    )
+    print(f"Variant cost: {variant_duration / human_duration:.0%} of the full pipeline")
+
+
+def _create_rigify_human(name):
+    bpy.context.scene.mtu_new_human_name = name
+    bpy.ops.mtu.new_unity_human()
+    bpy.ops.mtu.convert_to_rigify()
+
+
+def _select_hierarchy(armature):
+    bpy.ops.object.select_all(action="DESELECT")
+    for obj in [armature] + list(armature.children):
+        obj.select_set(True)
+    bpy.context.view_layer.objects.active = armature
+
+
+def _write_variants(filename, variants_count):
+    rng = random.Random(0)
+    variants = [
+        {"name": f"Variant{i}", "macros": {name: rng.random() for name in _MACROS}}
+        for i in range(variants_count)
+    ]
+    with open(filename, "w", encoding="utf-8") as json_file:
+        json.dump(variants, json_file)
+
+
+if __name__ == "__main__":
+    args = sys.argv[sys.argv.index("--") + 1 :] if "--" in sys.argv else []
+    main(int(args[0]) if args else 10)
@@ -34,12 +34,15 @@ def import_dependencies():
         ConvertToRigify,
         BakeMeshForUnity,
         RefitArmatureToMesh,
+        CancelStagedJob,
+        GenerateCrowdVariants,
     )
     from .panels import (
         NewUnityHumanPanel,
         ConvertToRigifyPanel,
         BakeMeshForUnityPanel,
         RefitArmatureToMeshPanel,
+        GenerateCrowdVariantsPanel,
     )
 
     return (
@@ -48,10 +51,13 @@ def import_dependencies():
         ConvertToRigify,
         BakeMeshForUnity,
         RefitArmatureToMesh,
+        CancelStagedJob,
+        GenerateCrowdVariants,
         NewUnityHumanPanel,
         ConvertToRigifyPanel,
         BakeMeshForUnityPanel,
         RefitArmatureToMeshPanel,
+        GenerateCrowdVariantsPanel,
     )
 
 
@@ -1 +1,17 @@
 from .deform_bones_hierarchy_helper import DeformBonesHierarchyHelper
+from .material_atlas_helper import MaterialAtlasHelper
+from .preflight_index import (
+    PreflightIndex,
+    PreflightProblem,
+    get_rig_definition,
+    get_rigify_bone_names,
+    report_preflight_problems,
+)
+from .rigify_refit_helper import RigifyRefitHelper
+from .staged_job import (
+    StagedJob,
+    draw_staged_job,
+    get_job_object,
+    request_staged_job_cancel,
+)
+from .unity_rigify_helpers import UnityRigifyHelpers
@@ -1,26 +1,45 @@
 from functools import reduce
 from bpy.ops import armature as ArmatureOps
 from rigify.utils.layers import DEF_LAYER, ROOT_LAYER
+from mpfb_to_unity.helpers.preflight_index import PreflightProblem
 from mpfb_to_unity.utils import change_armature_layers_contextually, change_mode_contextually
 
 
 class DeformBonesHierarchyHelper:
     def __init__(self, edit_bones):
         self._deform_bones = _get_bones_for_layer(edit_bones, DEF_LAYER)
-        self._root_bone = _get_bones_for_layer(edit_bones, ROOT_LAYER)[0]
+        root_bones = _get_bones_for_layer(edit_bones, ROOT_LAYER)
+        self._root_bone = root_bones[0] if root_bones else None
 
-    def simplify_hierarchy(self, armature, mesh):
-        _constraints_copy_queue = []
-        for bone in self._deform_bones:
-            if bone.parent == self._root_bone or bone.parent in self._deform_bones:
+    def validate(self, armature_name):
+        """Return problems preventing `simplify_hierarchy` without changing any bone"""
+        if self._root_bone is None:
+            return [PreflightProblem(armature_name, "Root bone not found")]
+
+        problems = []
+        deform_bone_names = {bone.name for bone in self._deform_bones}
+        for bone in self._get_bones_to_reparent():
+            try:
+                new_parent_name, _ = self._find_new_parent_name(bone)
+            except Exception as e:
+                problems.append(PreflightProblem(armature_name, f"Bone {bone.name}: {str(e)}"))
                 continue
 
+            if new_parent_name != "DEF-Root" and new_parent_name not in deform_bone_names:
+                problems.append(
+                    PreflightProblem(
+                        armature_name, f"Bone {bone.name}: parent {new_parent_name} not found"
+                    )
+                )
+        return problems
+
+    def simplify_hierarchy(self, armature, mesh):
+        _constraints_copy_queue = []
+        for bone in self._get_bones_to_reparent():
             try:
-                new_parent_name = self._convert_bone_name_to_def(bone.parent)
-                if new_parent_name == bone.name:
-                    # Some DEF bones parented to their ORG equivalent
+                new_parent_name, copy_constraints = self._find_new_parent_name(bone)
+                if copy_constraints:
                     _constraints_copy_queue.append((bone.parent.name, bone.name))
-                    new_parent_name = self._convert_bone_name_to_def(bone.parent.parent)
 
                 self._update_bone_parent(bone, new_parent_name)
             except Exception as e:
@@ -31,6 +50,20 @@ class DeformBonesHierarchyHelper:
         self._remove_unused_deform_bones(armature, mesh)
         return _constraints_copy_queue
 
+    def _get_bones_to_reparent(self):
+        return [
+            bone
+            for bone in self._deform_bones
+            if bone.parent != self._root_bone and bone.parent not in self._deform_bones
+        ]
+
+    def _find_new_parent_name(self, bone):
+        new_parent_name = self._convert_bone_name_to_def(bone.parent)
+        if new_parent_name == bone.name:
+            # Some DEF bones parented to their ORG equivalent
+            return self._convert_bone_name_to_def(bone.parent.parent), True
+        return new_parent_name, False
+
     def _convert_bone_name_to_def(self, bone):
         name_parts = bone.name.split("-")
         self._ensure_bone_prefix(name_parts, "ORG")
@@ -0,0 +1,275 @@
+import math
+import os
+
+import bpy
+import numpy as np
+
+_PADDING = 2
+_MIN_TILE_SIZE = 16
+_UV_EPSILON = 0.001
+_SUPPORTED_NODES = {"BSDF_PRINCIPLED", "TEX_IMAGE", "NORMAL_MAP", "OUTPUT_MATERIAL"}
+_FLAT_NORMAL = (0.5, 0.5, 1.0, 1.0)
+_ATLASED_INPUTS = {"Base Color", "Roughness", "Normal"}
+
+
+class MaterialAtlasHelper:
+    """Packs textures of simple principled materials into shared atlases.
+
+    Only opaque materials whose base color, roughness and normal inputs are
+    either constant or fed straight from an image texture are atlased, and only
+    when their UVs stay inside the 0-1 range. All other shader settings must
+    match, they are carried over to the atlas material. Everything runs on the
+    CPU with NumPy and Blender image buffers, so it works in background mode.
+    """
+
+    def __init__(self, mesh, atlas_size, texture_directory):
+        self._mesh = mesh
+        self._atlas_size = atlas_size
+        self._texture_directory = texture_directory
+        self.atlas_images = []
+
+    def atlas(self, name):
+        """Atlas what can be atlased and return the number of material slots saved.
+
+        Atlas images are created with their file path set but are not saved,
+        see `save_images`.
+        """
+        materials = self._mesh.data.materials
+        uv_layer = self._mesh.data.uv_layers.active
+        if len(materials) < 2 or uv_layer is None:
+            return 0
+
+        polygon_materials = self._get_polygon_materials()
+        loop_materials = self._get_loop_materials(polygon_materials)
+        uvs = _get_uvs(uv_layer)
+
+        # Only materials sharing the same non atlased settings can be merged
+        groups = {}
+        for index, material in enumerate(materials):
+            material_uvs = uvs[loop_materials == index]
+            if len(material_uvs) == 0:
+                continue  # unused slots cost no draw call
+            candidate = _get_material_channels_and_settings(material)
+            if candidate is not None and _uvs_in_unit_range(material_uvs):
+                channels, settings = candidate
+                groups.setdefault(settings, {})[index] = channels
+        groups = [(s, channels) for s, channels in groups.items() if len(channels) >= 2]
+
+        atlased_indices = []
+        atlas_materials_count = 0
+        for position, (settings, channels) in enumerate(groups):
+            cells = self._get_cells(list(channels))
+            _, _, tile_size = next(iter(cells.values()))
+            if tile_size - 2 * _PADDING < _MIN_TILE_SIZE:
+                continue
+
+            atlas_name = name if len(groups) == 1 else f"{name}{position + 1}"
+            self._remap_uvs(uv_layer, uvs, loop_materials, cells)
+            materials.append(self._create_atlas_material(atlas_name, channels, cells, settings))
+            polygon_materials[np.isin(polygon_materials, list(channels))] = len(materials) - 1
+            atlased_indices += list(channels)
+            atlas_materials_count += 1
+        if not atlased_indices:
+            return 0
+
+        self._mesh.data.polygons.foreach_set("material_index", polygon_materials)
+        # Popping a slot shifts the material indices of the polygons after it
+        for index in sorted(atlased_indices, reverse=True):
+            materials.pop(index=index)
+        return len(atlased_indices) - atlas_materials_count
+
+    def _get_polygon_materials(self):
+        polygons = self._mesh.data.polygons
+        polygon_materials = np.empty(len(polygons), dtype=np.int32)
+        polygons.foreach_get("material_index", polygon_materials)
+        return polygon_materials
+
+    def _get_loop_materials(self, polygon_materials):
+        polygons = self._mesh.data.polygons
+        loop_starts = np.empty(len(polygons), dtype=np.int32)
+        loop_totals = np.empty(len(polygons), dtype=np.int32)
+        polygons.foreach_get("loop_start", loop_starts)
+        polygons.foreach_get("loop_total", loop_totals)
+
+        order = np.argsort(loop_starts)
+        return np.repeat(polygon_materials[order], loop_totals[order])
+
+    def _get_cells(self, material_indices):
+        columns = math.ceil(math.sqrt(len(material_indices)))
+        tile_size = self._atlas_size // columns
+        return {
+            index: (position % columns * tile_size, position // columns * tile_size, tile_size)
+            for position, index in enumerate(material_indices)
+        }
+
+    def _remap_uvs(self, uv_layer, uvs, loop_materials, cells):
+        scales = np.ones(max(cells) + 1, dtype=np.float32)
+        offsets = np.zeros((max(cells) + 1, 2), dtype=np.float32)
+        for index, (x, y, tile_size) in cells.items():
+            scales[index] = (tile_size - 2 * _PADDING) / self._atlas_size
+            offsets[index] = ((x + _PADDING) / self._atlas_size, (y + _PADDING) / self._atlas_size)
+
+        mask = np.isin(loop_materials, list(cells))
+        atlased_materials = loop_materials[mask]
+        uvs[mask] = uvs[mask] * scales[atlased_materials, None] + offsets[atlased_materials]
+        uv_layer.data.foreach_set("uv", uvs.ravel())
+
+    def _create_atlas_material(self, name, channels, cells, settings):
+        inputs, distribution, subsurface_method, normal_strength, backface_culling = settings
+        material = bpy.data.materials.new(f"{name}Atlas")
+        material.use_nodes = True
+        material.use_backface_culling = backface_culling
+        nodes = material.node_tree.nodes
+        links = material.node_tree.links
+        bsdf = next(node for node in nodes if node.type == "BSDF_PRINCIPLED")
+        bsdf.distribution = distribution
+        bsdf.subsurface_method = subsurface_method
+        bsdf_inputs = {socket.identifier: socket for socket in bsdf.inputs}
+        for identifier, value in inputs:
+            bsdf_inputs[identifier].default_value = value
+
+        diffuse = self._create_atlas_node(material, name, "Diffuse", "sRGB", channels, cells)
+        links.new(diffuse.outputs["Color"], bsdf.inputs["Base Color"])
+        roughness = self._create_atlas_node(
+            material, name, "Roughness", "Non-Color", channels, cells
+        )
+        links.new(roughness.outputs["Color"], bsdf.inputs["Roughness"])
+        normal = self._create_atlas_node(material, name, "Normal", "Non-Color", channels, cells)
+        normal_map = nodes.new("ShaderNodeNormalMap")
+        normal_map.inputs["Strength"].default_value = normal_strength
+        links.new(normal.outputs["Color"], normal_map.inputs["Color"])
+        links.new(normal_map.outputs["Normal"], bsdf.inputs["Normal"])
+        return material
+
+    def _create_atlas_node(self, material, name, channel, colorspace, channels, cells):
+        pixels = np.zeros((self._atlas_size, self._atlas_size, 4), dtype=np.float32)
+        for index, (x, y, tile_size) in cells.items():
+            source = channels[index][channel]
+            tile = _get_tile_pixels(source, tile_size - 2 * _PADDING)
+            tile = np.pad(tile, ((_PADDING, _PADDING), (_PADDING, _PADDING), (0, 0)), mode="edge")
+            pixels[y : y + tile_size, x : x + tile_size] = tile
+
+        image = bpy.data.images.new(
+            f"{name}{channel}Atlas", self._atlas_size, self._atlas_size, alpha=True
+        )
+        image.colorspace_settings.name = colorspace
+        image.pixels.foreach_set(pixels.ravel())
+        # FBX references textures by path, packed images would be lost on export
+        image.filepath_raw = os.path.join(self._texture_directory, f"{image.name}.png")
+        image.file_format = "PNG"
+        self.atlas_images.append(image)
+
+        node = material.node_tree.nodes.new("ShaderNodeTexImage")
+        node.image = image
+        return node
+
+    @staticmethod
+    def save_images(images):
+        for image in images:
+            os.makedirs(os.path.dirname(image.filepath_raw), exist_ok=True)
+            image.save()
+
+
+def _get_material_channels_and_settings(material):
+    """Return image or constant pixel for each channel with the other shader settings.
+
+    None is returned when the material can't be atlased.
+    """
+    if material is None or not material.use_nodes or material.blend_method != "OPAQUE":
+        return None
+    nodes = material.node_tree.nodes
+    if any(node.type not in _SUPPORTED_NODES for node in nodes):
+        return None
+    bsdfs = [node for node in nodes if node.type == "BSDF_PRINCIPLED"]
+    if len(bsdfs) != 1:
+        return None
+    bsdf = bsdfs[0]
+
+    base_color = bsdf.inputs["Base Color"]
+    roughness = bsdf.inputs["Roughness"]
+    normal, normal_strength = _get_normal_image(bsdf.inputs["Normal"])
+    channels = {
+        "Diffuse": _get_input_image(base_color, _linear_to_srgb(base_color.default_value)),
+        "Roughness": _get_input_image(roughness, (roughness.default_value,) * 3 + (1.0,)),
+        "Normal": normal,
+    }
+    if any(source is None for source in channels.values()):
+        return None
+
+    inputs = []
+    for socket in bsdf.inputs:
+        if socket.name in _ATLASED_INPUTS:
+            continue
+        if socket.is_linked:
+            return None
+        if hasattr(socket, "default_value"):
+            inputs.append((socket.identifier, _to_hashable(socket.default_value)))
+    settings = (
+        tuple(inputs),
+        bsdf.distribution,
+        bsdf.subsurface_method,
+        normal_strength,
+        material.use_backface_culling,
+    )
+    return channels, settings
+
+
+def _get_input_image(socket, constant):
+    if not socket.is_linked:
+        return constant
+    link = socket.links[0]
+    node = link.from_node
+    if node.type != "TEX_IMAGE" or link.from_socket.name != "Color":
+        return None
+    if node.image is None or node.image.size[0] == 0 or node.inputs["Vector"].is_linked:
+        return None
+    return node.image
+
+
+def _get_normal_image(socket):
+    """Return normal image or constant pixel with the normal map strength"""
+    if not socket.is_linked:
+        return _FLAT_NORMAL, 1.0
+    node = socket.links[0].from_node
+    if node.type != "NORMAL_MAP" or node.space != "TANGENT" or node.uv_map:
+        return None, None
+    if node.inputs["Strength"].is_linked:
+        return None, None
+    strength = node.inputs["Strength"].default_value
+    return _get_input_image(node.inputs["Color"], _FLAT_NORMAL), strength
+
+
+def _get_tile_pixels(source, size):
+    if not isinstance(source, bpy.types.Image):
+        return np.broadcast_to(np.array(source, dtype=np.float32), (size, size, 4))
+
+    image = source.copy()
+    try:
+        image.scale(size, size)
+        pixels = np.empty(size * size * 4, dtype=np.float32)
+        image.pixels.foreach_get(pixels)
+    finally:
+        bpy.data.images.remove(image)
+    return pixels.reshape(size, size, 4)
+
+
+def _get_uvs(uv_layer):
+    uvs = np.empty(len(uv_layer.data) * 2, dtype=np.float32)
+    uv_layer.data.foreach_get("uv", uvs)
+    return uvs.reshape(-1, 2)
+
+
+def _uvs_in_unit_range(uvs):
+    return np.all(uvs >= -_UV_EPSILON) and np.all(uvs <= 1 + _UV_EPSILON)
+
+
+def _linear_to_srgb(color):
+    rgb = np.array(color[:3], dtype=np.float32)
+    srgb = np.where(rgb <= 0.0031308, rgb * 12.92, 1.055 * np.power(rgb, 1 / 2.4) - 0.055)
+    return tuple(srgb) + (1.0,)
+
+
+def _to_hashable(value):
+    if hasattr(value, "__len__") and not isinstance(value, str):
+        return tuple(value)
+    return value
@@ -0,0 +1,137 @@
+import os
+from collections import namedtuple
+from functools import lru_cache
+
+from mpfb.services.objectservice import ObjectService
+from rigify.utils.layers import DEF_LAYER
+from mpfb_to_unity.helpers.unity_rigify_helpers import UnityRigifyHelpers
+from mpfb_to_unity.utils import get_data_directory, load_json
+
+PreflightProblem = namedtuple("PreflightProblem", ["object_name", "message"])
+
+_BAKE_REQUIRED_GROUPS = ("JointCubes", "HelperGeometry")
+_RIGIFY_PREFIXES = ("DEF-", "ORG-", "MCH-")
+_RIGIFY_REFIT_PREFIXES = ("DEF-", "ORG-")
+
+
+class PreflightIndex:
+    """Cheap snapshot of everything operators rely on, built before any heavy work.
+
+    Each `check_*` method returns a list of `PreflightProblem`, empty when the
+    operation can run. Batch scripts can build one index per character and skip
+    the broken ones without touching the scene.
+    """
+
+    def __init__(self, armature):
+        self.armature = armature
+        self.children = list(armature.children)
+        self.basemeshes = [obj for obj in self.children if ObjectService.object_is_basemesh(obj)]
+        self.basemesh = ObjectService.find_object_of_type_amongst_nearest_relatives(
+            armature, "Basemesh"
+        )
+        self.vertex_groups = {
+            obj.name: set(obj.vertex_groups.keys()) for obj in self.children if obj.type == "MESH"
+        }
+        if self.basemesh is not None:
+            self.vertex_groups[self.basemesh.name] = set(self.basemesh.vertex_groups.keys())
+
+        bones = armature.data.bones if armature.type == "ARMATURE" else []
+        self.bones = {bone.name: bone for bone in bones}
+        self.bone_layers = {bone.name: tuple(bone.layers) for bone in bones}
+
+    def check_bake(self):
+        problems = self._check_is_armature()
+        if len(self.basemeshes) != 1:
+            problems.append(
+                self._problem(f"Expected one basemesh child, found {len(self.basemeshes)}")
+            )
+        for basemesh in self.basemeshes:
+            problems += self._check_groups(basemesh, _BAKE_REQUIRED_GROUPS)
+        return problems
+
+    def check_convert_to_rigify(self):
+        problems = self._check_is_armature() + self._check_basemesh()
+        if self._is_rigify():
+            problems.append(self._problem("Armature is already converted to rigify"))
+        for name in UnityRigifyHelpers.get_required_bones():
+            if name not in self.bones:
+                problems.append(self._problem(f"Bone '{name}' not found"))
+        for name in UnityRigifyHelpers.get_created_bones():
+            if name in self.bones:
+                problems.append(self._problem(f"Bone '{name}' already exists"))
+        return problems
+
+    def check_refit(self):
+        problems = self._check_is_armature() + self._check_basemesh()
+        if problems:
+            return problems
+        return self._check_rig_definition(lambda bone_name: [bone_name])
+
+    def check_refit_rigify(self):
+        problems = self._check_is_armature() + self._check_basemesh()
+        if problems:
+            return problems
+        if not self._is_rigify():
+            return [self._problem("Armature is not converted to rigify")]
+        return self._check_rig_definition(get_rigify_bone_names)
+
+    def _check_rig_definition(self, get_bone_names):
+        problems = []
+        vertex_count = len(self.basemesh.data.vertices)
+        cube_names = set()
+        for bone_name, bone_info in get_rig_definition().items():
+            if not any(name in self.bones for name in get_bone_names(bone_name)):
+                problems.append(self._problem(f"Bone '{bone_name}' not found"))
+            for joint in (bone_info["head"], bone_info["tail"]):
+                if "cube_name" in joint:
+                    cube_names.add(joint["cube_name"])
+                if any(index >= vertex_count for index in joint.get("vertex_indices", [])):
+                    problems.append(
+                        self._problem(f"Bone '{bone_name}' uses missing basemesh vertices")
+                    )
+        return problems + self._check_groups(self.basemesh, sorted(cube_names))
+
+    def _is_rigify(self):
+        return any(name.startswith(_RIGIFY_PREFIXES) for name in self.bones) or any(
+            _is_on_layer(layers, DEF_LAYER) for layers in self.bone_layers.values()
+        )
+
+    def _check_is_armature(self):
+        if self.armature.type != "ARMATURE":
+            return [self._problem("Object is not an armature")]
+        return []
+
+    def _check_basemesh(self):
+        if self.basemesh is None:
+            return [self._problem("Basemesh not found amongst nearest relatives")]
+        return []
+
+    def _check_groups(self, obj, group_names):
+        groups = self.vertex_groups[obj.name]
+        return [
+            PreflightProblem(obj.name, f"Group '{name}' not found")
+            for name in group_names
+            if name not in groups
+        ]
+
+    def _problem(self, message):
+        return PreflightProblem(self.armature.name, message)
+
+
+@lru_cache(maxsize=None)
+def get_rig_definition():
+    return load_json(os.path.join(get_data_directory(), "rig.json"))
+
+
+def get_rigify_bone_names(bone_name):
+    """Rigify bones standing for a bone of the MPFB skeleton"""
+    return [f"{prefix}{bone_name}" for prefix in _RIGIFY_REFIT_PREFIXES]
+
+
+def report_preflight_problems(operator, problems):
+    for problem in problems:
+        operator.report({"ERROR"}, f"{problem.object_name}: {problem.message}")
+
+
+def _is_on_layer(bone_layers, layer_mask):
+    return all(on_layer for on_layer, in_mask in zip(bone_layers, layer_mask) if in_mask)
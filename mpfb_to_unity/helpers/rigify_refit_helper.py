@@ -0,0 +1,63 @@
+import numpy as np
+from mpfb_to_unity.helpers.preflight_index import get_rig_definition, get_rigify_bone_names
+
+
+class RigifyRefitHelper:
+    """Moves the deform and original bones of a rigify rig onto the basemesh joints.
+
+    Joint positions follow the strategies of rig.json. Controls and mechanism bones
+    are left in place, so the refitted rig must be exported in rest position.
+    """
+
+    def __init__(self, armature, basemesh):
+        self._armature = armature
+        self._basemesh = basemesh
+
+    def refit(self):
+        """Refit edit bones, the armature must be in edit mode"""
+        coordinates = self._get_basemesh_coordinates()
+        group_vertices = self._get_group_vertices()
+        edit_bones = self._armature.data.edit_bones
+        for bone_name, bone_info in get_rig_definition().items():
+            head = _get_joint_position(bone_info["head"], coordinates, group_vertices)
+            tail = _get_joint_position(bone_info["tail"], coordinates, group_vertices)
+            for name in get_rigify_bone_names(bone_name):
+                bone = edit_bones.get(name)
+                if bone is not None:
+                    bone.head = head
+                    bone.tail = tail
+
+    def _get_basemesh_coordinates(self):
+        """Vertices with the macro shape keys applied, in armature space"""
+        mesh = self._basemesh.data
+        if mesh.shape_keys is None:
+            coordinates = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+            mesh.vertices.foreach_get("co", coordinates)
+        else:
+            mix = self._basemesh.shape_key_add(name="Refit", from_mix=True)
+            coordinates = np.empty(len(mix.data) * 3, dtype=np.float32)
+            mix.data.foreach_get("co", coordinates)
+            self._basemesh.shape_key_remove(mix)
+
+        matrix = np.array(self._armature.matrix_world.inverted() @ self._basemesh.matrix_world)
+        return coordinates.reshape(-1, 3) @ matrix[:3, :3].T + matrix[:3, 3]
+
+    def _get_group_vertices(self):
+        group_vertices = {group.index: [] for group in self._basemesh.vertex_groups}
+        for vertex in self._basemesh.data.vertices:
+            for vertex_group in vertex.groups:
+                group_vertices[vertex_group.group].append(vertex.index)
+        return {
+            group.name: group_vertices[group.index] for group in self._basemesh.vertex_groups
+        }
+
+
+def _get_joint_position(joint, coordinates, group_vertices):
+    strategy = joint["strategy"]
+    if strategy == "CUBE":
+        indices = group_vertices[joint["cube_name"]]
+    elif strategy == "MEAN":
+        indices = joint["vertex_indices"]
+    else:
+        raise Exception(f"Unknown joint strategy: {strategy}")
+    return tuple(coordinates[indices].mean(axis=0))
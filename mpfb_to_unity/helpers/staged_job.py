@@ -0,0 +1,214 @@
+import time
+
+import bpy
+from bpy.app.handlers import persistent
+from mpfb_to_unity.helpers.preflight_index import report_preflight_problems
+from mpfb_to_unity.utils import change_mode
+
+_TIMER_INTERVAL = 0.1
+_RUNNING_JOBS = {}
+_UNDO_MARKER = "mtu_staged_job_start"
+
+
+class StagedJobProgress:
+    def __init__(self, label, stages):
+        self.label = label
+        self.stages = stages
+        self.stage_index = 0
+        self.started = False
+        self.stage_durations = []
+        self.cancel_requested = False
+        self.undo_used = False
+
+    @property
+    def current_stage_label(self):
+        return self.stages[self.stage_index][0]
+
+    @property
+    def finished(self):
+        return self.stage_index >= len(self.stages)
+
+
+class StagedJob:
+    """Operator mixin splitting work into stages.
+
+    `execute` runs all stages at once (scripts, background mode, redo panel),
+    `invoke` runs one stage per timer tick so the UI stays responsive and the
+    job can be cancelled between stages. Cancellation and failures undo
+    everything done since the job started. Nothing runs while
+    `get_preflight_problems` reports problems.
+
+    Only one job runs at a time. Undo invalidates object references, so stages
+    must keep object names and look objects up with `get_job_object`.
+    """
+
+    def get_stages(self, context):
+        return []
+
+    def get_preflight_problems(self, context):
+        return []
+
+    def execute(self, context):
+        problems = self.get_preflight_problems(context)
+        if problems:
+            report_preflight_problems(self, problems)
+            return {"CANCELLED"}
+
+        for _, stage in self.get_stages(context):
+            stage(context)
+        return {"FINISHED"}
+
+    def invoke(self, context, event):
+        if bpy.app.background:
+            return self.execute(context)
+        if _RUNNING_JOBS:
+            running = next(iter(_RUNNING_JOBS.values()))
+            self.report({"WARNING"}, f"{running.label} is already running")
+            return {"CANCELLED"}
+        problems = self.get_preflight_problems(context)
+        if problems:
+            report_preflight_problems(self, problems)
+            return {"CANCELLED"}
+
+        _push_job_start_undo_step(context, self.bl_idname, self.bl_label)
+        self._progress = StagedJobProgress(self.bl_label, self.get_stages(context))
+        _RUNNING_JOBS[self.bl_idname] = self._progress
+        for handlers in (bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+            if _on_undo not in handlers:
+                handlers.append(_on_undo)
+        self._timer = context.window_manager.event_timer_add(_TIMER_INTERVAL, window=context.window)
+        context.window_manager.modal_handler_add(self)
+        _redraw_ui(context)
+        return {"RUNNING_MODAL"}
+
+    def modal(self, context, event):
+        if self._progress.cancel_requested:
+            self._stop(context, rollback=True)
+            self.report({"WARNING"}, f"{self.bl_label} cancelled")
+            return {"CANCELLED"}
+        if self._progress.undo_used:
+            self._stop(context, rollback=True)
+            self.report({"ERROR"}, f"{self.bl_label} stopped, undo was used while it was running")
+            return {"CANCELLED"}
+        if event.type != "TIMER":
+            return {"PASS_THROUGH"}
+
+        label, stage = self._progress.stages[self._progress.stage_index]
+        self._progress.started = True
+        start = time.perf_counter()
+        try:
+            stage(context)
+        except Exception as e:
+            self._stop(context, rollback=True)
+            self.report({"ERROR"}, f"{self.bl_label} failed at '{label}', reason: {str(e)}")
+            return {"CANCELLED"}
+
+        duration = time.perf_counter() - start
+        self._progress.stage_durations.append((label, duration))
+        self._progress.stage_index += 1
+        if self._progress.finished:
+            self._stop(context, rollback=False)
+            return {"FINISHED"}
+
+        _redraw_ui(context)
+        return {"RUNNING_MODAL"}
+
+    def cancel(self, context):
+        # Blender stops the modal on file load or window close, nothing to roll back to
+        self._stop(context, rollback=False)
+
+    def _stop(self, context, rollback):
+        context.window_manager.event_timer_remove(self._timer)
+        _RUNNING_JOBS.pop(self.bl_idname, None)
+        for handlers in (bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+            if _on_undo in handlers:
+                handlers.remove(_on_undo)
+
+        if rollback and self._progress.started:
+            artist_steps = _undo_to_job_start(context, self.bl_idname)
+            if artist_steps is None:
+                self.report(
+                    {"WARNING"},
+                    f"{self.bl_label} not rolled back, its start is no longer in the undo history",
+                )
+            elif artist_steps:
+                self.report(
+                    {"WARNING"},
+                    f"{self.bl_label} rolled back with {artist_steps} edits made while it ran",
+                )
+        _redraw_ui(context)
+
+
+def get_job_object(name):
+    """Look an object up again, undo invalidates references kept between stages"""
+    obj = bpy.data.objects.get(name)
+    if obj is None:
+        raise Exception(f"Object '{name}' no longer exists")
+    return obj
+
+
+def request_staged_job_cancel(bl_idname):
+    progress = _RUNNING_JOBS.get(bl_idname)
+    if progress is not None:
+        progress.cancel_requested = True
+
+
+def draw_staged_job(layout, bl_idname):
+    """Draw the job progress with a cancel button, or the operator button when idle"""
+    progress = _RUNNING_JOBS.get(bl_idname)
+    if progress is None:
+        layout.operator(bl_idname)
+        return
+
+    stage_number = min(progress.stage_index + 1, len(progress.stages))
+    layout.label(text=f"{stage_number}/{len(progress.stages)}: {progress.current_stage_label}")
+    if progress.stage_durations:
+        label, duration = progress.stage_durations[-1]
+        layout.label(text=f"{label}: {duration:.2f}s")
+    layout.operator("mtu.cancel_staged_job").job = bl_idname
+
+
+def _push_job_start_undo_step(context, bl_idname, bl_label):
+    # Only the job start step carries the marker, so it can be found again however
+    # many undo steps the artist pushes while the job runs
+    context.scene[_UNDO_MARKER] = bl_idname
+    bpy.ops.ed.undo_push(message=f"Before {bl_label}")
+    del context.scene[_UNDO_MARKER]
+
+
+def _undo_to_job_start(context, bl_idname):
+    """Undo to the job start step and return the number of artist steps undone.
+
+    None is returned, with nothing undone, when the start step already dropped
+    off the undo history.
+    """
+    if context.active_object is not None:
+        change_mode("OBJECT")
+    bpy.ops.ed.undo_push(message="Cancelled")
+    undone = 0
+    while undone < bpy.context.preferences.edit.undo_steps and bpy.ops.ed.undo.poll():
+        bpy.ops.ed.undo()
+        undone += 1
+        for scene in bpy.data.scenes:
+            if scene.get(_UNDO_MARKER) == bl_idname:
+                del scene[_UNDO_MARKER]
+                # The first undo only leaves the "Cancelled" step
+                return undone - 1
+
+    for _ in range(undone):
+        bpy.ops.ed.redo()
+    return None
+
+
+@persistent
+def _on_undo(*_):
+    # Rollbacks run after the job is removed, so only undo by the artist gets here
+    for progress in _RUNNING_JOBS.values():
+        progress.undo_used = True
+
+
+def _redraw_ui(context):
+    for window in context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == "VIEW_3D":
+                area.tag_redraw()
@@ -0,0 +1,82 @@
+import bpy
+from mpfb.services.rigifyhelpers.gameenginerigifyhelpers import GameEngineRigifyHelpers
+from mpfb.services.rigservice import RigService
+
+_HEAD_BONES = ("neck_01", "head", "jaw", "eye_l", "eye_r")
+
+
+class UnityRigifyHelpers(GameEngineRigifyHelpers):
+    @staticmethod
+    def get_required_bones():
+        """Bones this helper relies on in the MPFB skeleton"""
+        return _HEAD_BONES + tuple(_get_foot_name(left_side) for left_side in (True, False))
+
+    @staticmethod
+    def get_created_bones():
+        return tuple(_get_heel_name(left_side) for left_side in (True, False))
+
+    def get_list_of_head_bones(self):
+        return list(_HEAD_BONES)
+
+    def get_list_of_connected_head_bones(self):
+        return ["neck_01", "head"]
+
+    def _setup_legs(self, armature_object):
+        for side in [True, False]:
+            leg = self.get_list_of_leg_bones(side)
+            self._set_use_connect_on_bones(armature_object, leg)
+            self._create_heel(armature_object, side)
+            bpy.ops.object.mode_set(mode="POSE", toggle=False)
+            first_leg_bone = RigService.find_pose_bone_by_name(leg[0], armature_object)
+            first_leg_bone.rigify_type = "limbs.leg"
+
+    def _setup_head(self, armature_object):
+        head = self.get_list_of_connected_head_bones()
+        self._set_use_connect_on_bones(armature_object, head)
+        bpy.ops.object.mode_set(mode="POSE", toggle=False)
+        first_head_bone = RigService.find_pose_bone_by_name(head[0], armature_object)
+        first_head_bone.rigify_type = "spines.super_head"
+        self._setup_face(armature_object)
+
+    def _setup_face(self, armature_object):
+        jaw_bone = RigService.find_pose_bone_by_name("jaw", armature_object)
+        jaw_bone.rigify_type = "basic.super_copy"
+        jaw_bone.rigify_parameters.super_copy_widget_type = "jaw"
+
+        for eye in ("eye_l", "eye_r"):
+            eye_bone = RigService.find_pose_bone_by_name(eye, armature_object)
+            eye_bone.rigify_type = "basic.super_copy"
+
+    def _create_heel(self, armature_object, left_side):
+        bpy.ops.object.mode_set(mode="EDIT", toggle=False)
+        bones = armature_object.data.edit_bones
+        foot = RigService.find_edit_bone_by_name(_get_foot_name(left_side), armature_object)
+
+        heel = bones.new(_get_heel_name(left_side))
+        heel.parent = foot
+        heel.use_connect = False
+
+        for joint in (heel.head, heel.tail):
+            joint.x = foot.head.x
+            joint.y = 0
+            joint.z = foot.tail.z
+
+        self._set_heel_width(heel, left_side)
+
+    def _set_heel_width(self, bone, left_side):
+        HEEL_WIDTH = 0.02
+        if left_side:
+            right, left = bone.head, bone.tail
+        else:
+            right, left = bone.tail, bone.head
+
+        right.x -= HEEL_WIDTH / 2
+        left.x += HEEL_WIDTH / 2
+
+
+def _get_foot_name(left_side):
+    return "foot_l" if left_side else "foot_r"
+
+
+def _get_heel_name(left_side):
+    return "heel_l" if left_side else "heel_r"
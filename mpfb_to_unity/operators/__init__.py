@@ -1,5 +1,7 @@
 from .bake_mesh import BakeMeshForUnity
+from .cancel_staged_job import CancelStagedJob
 from .convert_to_rigify import ConvertToRigify
+from .crowd_variants import GenerateCrowdVariants
 from .export import ExportUnityFbx
 from .new_unity_human import NewUnityHuman
 from .refit_armature_to_mesh import RefitArmatureToMesh
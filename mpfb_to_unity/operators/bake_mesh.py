@@ -1,10 +1,69 @@
+from fnmatch import fnmatchcase
+
 import bpy
-from bpy.types import Operator
+import numpy as np
+from bpy.types import Operator, Scene
+from mpfb.services.blenderconfigset import BlenderConfigSet
 from mpfb.services.objectservice import ObjectService
+from mpfb_to_unity.helpers import (
+    MaterialAtlasHelper,
+    PreflightIndex,
+    PreflightProblem,
+    StagedJob,
+    get_job_object,
+)
 from mpfb_to_unity.utils import select_objects, change_mode_contextually, rename_object
 
+BAKE_MESH_PROPERTIES = BlenderConfigSet(
+    [
+        {
+            "name": "keep_shape_keys",
+            "label": "Keep shape keys",
+            "description": "Comma separated shape key names (wildcards allowed) "
+            "to keep as Unity blend shapes, all other shape keys are applied",
+            "type": "string",
+            "default": "",
+        },
+        {
+            "name": "shape_key_tolerance",
+            "label": "Shape key tolerance",
+            "description": "Vertex offsets below this distance are dropped from kept shape keys",
+            "type": "float",
+            "default": 0.0001,
+        },
+        {
+            "name": "atlas_materials",
+            "label": "Atlas materials",
+            "description": "Pack textures of merged materials into shared atlases "
+            "to reduce draw calls in Unity",
+            "type": "boolean",
+            "default": False,
+        },
+        {
+            "name": "atlas_size",
+            "label": "Atlas size",
+            "description": "Width and height of atlas textures in pixels",
+            "type": "int",
+            "default": 4096,
+        },
+        {
+            "name": "atlas_directory",
+            "label": "Atlas directory",
+            "description": "Directory where atlas textures are saved",
+            "type": "string",
+            "default": "//textures",
+        },
+    ],
+    Scene,
+    prefix="mtu_bake_mesh_",
+)
+
+# FBX stores blend shape vertices as double precision positions and int32 indices
+_BLEND_SHAPE_VERTEX_SIZE = 3 * 8 + 4
+_SLIDER_LIMITS = (-10.0, 10.0)
 
-class BakeMeshForUnity(Operator):
+
+class BakeMeshForUnity(StagedJob, Operator):
     bl_idname = "mtu.bake_mesh_for_unity"
     bl_label = "Bake"
     bl_options = {"REGISTER", "UNDO"}
@@ -13,27 +72,81 @@ class BakeMeshForUnity(Operator):
     def poll(cls, context):
         return context.active_object and context.active_object.type == "ARMATURE"
 
-    def execute(self, context):
-        name = context.active_object.name
+    def get_preflight_problems(self, context):
+        return get_bake_preflight_problems(context, context.active_object)
+
+    def get_stages(self, context):
+        armature_name = context.active_object.name
+        stages = [
+            (
+                "Duplicate hierarchy",
+                lambda context: self._duplicate_hierarchy(context, armature_name),
+            ),
+            ("Apply shape keys", self._apply_shape_keys_stage),
+            ("Remove joints", self._remove_joints_stage),
+            ("Merge meshes", self._merge_meshes_stage),
+        ]
+        atlas_materials = BAKE_MESH_PROPERTIES.get_value(
+            "atlas_materials", entity_reference=context.scene
+        )
+        if atlas_materials:
+            stages.append(("Atlas materials", self._atlas_materials_stage))
+        stages.append(("Extract helpers", self._extract_helpers_stage))
+        if atlas_materials:
+            # Last, so rolled back bakes leave no files behind
+            stages.append(("Save atlases", self._save_atlases_stage))
+        return stages
+
+    def _duplicate_hierarchy(self, context, armature_name):
+        self._name = armature_name
+        select_objects(context, [get_job_object(armature_name)])
         bpy.ops.object.select_hierarchy(direction="CHILD", extend=True)
         original_objects = context.selected_objects
         self._rename_original_objects(original_objects)
 
         bpy.ops.object.duplicate()
         new_objects = context.selected_objects
-        self._rename_armature(new_objects, name)
-
+        self._rename_armature(new_objects, self._name)
         self._hide_objects(original_objects)
-        self._apply_shape_keys(context, new_objects)
-        self._remove_joints(context, new_objects)
-        mesh = self._merge_meshes(context, new_objects, name)
-        meshes = self._extract_helpers(context, mesh, name)
+        self._new_object_names = [obj.name for obj in new_objects]
+
+    def _get_new_objects(self):
+        return [get_job_object(name) for name in self._new_object_names]
+
+    def _apply_shape_keys_stage(self, context):
+        keep_patterns = self._get_keep_shape_keys_patterns(context)
+        tolerance = BAKE_MESH_PROPERTIES.get_value(
+            "shape_key_tolerance", entity_reference=context.scene
+        )
+        self._apply_shape_keys(context, self._get_new_objects(), keep_patterns, tolerance)
+
+    def _remove_joints_stage(self, context):
+        self._remove_joints(context, self._get_new_objects())
+
+    def _merge_meshes_stage(self, context):
+        self._mesh_name = self._merge_meshes(context, self._get_new_objects(), self._name).name
+
+    def _atlas_materials_stage(self, context):
+        atlas_size = BAKE_MESH_PROPERTIES.get_value("atlas_size", entity_reference=context.scene)
+        atlas_directory = BAKE_MESH_PROPERTIES.get_value(
+            "atlas_directory", entity_reference=context.scene
+        )
+        mesh = get_job_object(self._mesh_name)
+        materials_count = len(mesh.data.materials)
+        helper = MaterialAtlasHelper(mesh, atlas_size, bpy.path.abspath(atlas_directory))
+        saved = helper.atlas(self._name)
+        self._atlas_image_names = [image.name for image in helper.atlas_images]
+        self.report({"INFO"}, f"Atlasing saved {saved} of {materials_count} draw calls")
+
+    def _save_atlases_stage(self, context):
+        MaterialAtlasHelper.save_images([bpy.data.images[name] for name in self._atlas_image_names])
+
+    def _extract_helpers_stage(self, context):
+        meshes = self._extract_helpers(context, get_job_object(self._mesh_name), self._name)
         for mesh in meshes:
             self._remove_modifier(mesh, "Hide helpers")
             self._remove_empty_vertex_groups(mesh)
 
-        return {"FINISHED"}
-
     def _rename_original_objects(self, objects):
         for obj in objects:
             rename_object(obj, f"{obj.name}Original")
@@ -47,15 +160,98 @@ class BakeMeshForUnity(Operator):
         for obj in objects:
             obj.hide_set(True)
 
-    def _apply_shape_keys(self, context, objects):
+    def _get_keep_shape_keys_patterns(self, context):
+        value = BAKE_MESH_PROPERTIES.get_value("keep_shape_keys", entity_reference=context.scene)
+        return [pattern.strip() for pattern in value.split(",") if pattern.strip()]
+
+    def _apply_shape_keys(self, context, objects, keep_patterns, tolerance):
+        stored_vertices = 0
+        dropped_vertices = 0
         for obj in objects:
-            if obj.type != "MESH":
+            if obj.type != "MESH" or obj.data.shape_keys is None:
                 continue
+            exported_mask = self._get_exported_vertices_mask(obj)
+            kept_keys = self._extract_kept_shape_keys(obj, keep_patterns, tolerance)
+
             context.view_layer.objects.active = obj
             bpy.ops.object.shape_key_add(from_mix=True)
             for shape_key in obj.data.shape_keys.key_blocks:
                 obj.shape_key_remove(shape_key)
 
+            if kept_keys:
+                self._restore_kept_shape_keys(obj, kept_keys)
+            for kept_key in kept_keys:
+                stored_vertices += np.count_nonzero(exported_mask[kept_key["indices"]])
+                dropped_vertices += np.count_nonzero(exported_mask[kept_key["dropped_indices"]])
+
+        if stored_vertices or dropped_vertices:
+            saved = dropped_vertices * _BLEND_SHAPE_VERTEX_SIZE
+            self.report(
+                {"INFO"},
+                f"Blend shapes store {stored_vertices} vertices, {dropped_vertices} "
+                f"below tolerance dropped, {saved / 1024:.1f} KiB saved",
+            )
+
+    def _get_exported_vertices_mask(self, obj):
+        """Vertices surviving the bake, joint cubes are removed later"""
+        mask = np.ones(len(obj.data.vertices), dtype=bool)
+        if ObjectService.object_is_basemesh(obj):
+            group_index = self._find_group_index(obj, "JointCubes")
+            mask[self._get_group_vertecies(obj, group_index)] = False
+        return mask
+
+    def _extract_kept_shape_keys(self, obj, keep_patterns, tolerance):
+        kept_keys = []
+        key_blocks = obj.data.shape_keys.key_blocks
+        reference_key = obj.data.shape_keys.reference_key
+        for shape_key in key_blocks:
+            if shape_key == reference_key or not any(
+                fnmatchcase(shape_key.name, pattern) for pattern in keep_patterns
+            ):
+                continue
+
+            deltas = _get_shape_key_coordinates(shape_key) - _get_shape_key_coordinates(
+                shape_key.relative_key
+            )
+            distances = np.linalg.norm(deltas, axis=1)
+            indices = np.flatnonzero(distances > tolerance)
+            kept_keys.append(
+                {
+                    "name": shape_key.name,
+                    "value": shape_key.value,
+                    "slider_min": shape_key.slider_min,
+                    "slider_max": shape_key.slider_max,
+                    "vertex_group": shape_key.vertex_group,
+                    "mute": shape_key.mute,
+                    "indices": indices,
+                    "deltas": deltas[indices],
+                    # FBX exporter already skips unchanged vertices, these are the ones saved
+                    "dropped_indices": np.flatnonzero((distances > 0) & (distances <= tolerance)),
+                }
+            )
+            # Kept keys must not leak into the applied mix, a zero value would be
+            # clamped to slider_min
+            shape_key.mute = True
+        return kept_keys
+
+    def _restore_kept_shape_keys(self, obj, kept_keys):
+        basis = obj.shape_key_add(name="Basis", from_mix=False)
+        basis_coordinates = _get_shape_key_coordinates(basis)
+        for kept_key in kept_keys:
+            coordinates = basis_coordinates.copy()
+            coordinates[kept_key["indices"]] += kept_key["deltas"]
+            shape_key = obj.shape_key_add(name=kept_key["name"], from_mix=False)
+            shape_key.data.foreach_set("co", coordinates.ravel())
+            # Slider range must be set first, value is clamped to it. Widen the range
+            # before narrowing it, as each bound is clamped against the other
+            shape_key.slider_min = _SLIDER_LIMITS[0]
+            shape_key.slider_max = _SLIDER_LIMITS[1]
+            shape_key.slider_min = kept_key["slider_min"]
+            shape_key.slider_max = kept_key["slider_max"]
+            shape_key.value = kept_key["value"]
+            shape_key.vertex_group = kept_key["vertex_group"]
+            shape_key.mute = kept_key["mute"]
+
     def _remove_joints(self, context, objects):
         for obj in objects:
             if not ObjectService.object_is_basemesh(obj):
@@ -135,3 +331,27 @@ class BakeMeshForUnity(Operator):
 
         for i in vertecies:
             obj.data.vertices[i].select = True
+
+
+def get_bake_preflight_problems(context, armature):
+    problems = PreflightIndex(armature).check_bake()
+    atlas_directory = BAKE_MESH_PROPERTIES.get_value(
+        "atlas_directory", entity_reference=context.scene
+    )
+    if (
+        BAKE_MESH_PROPERTIES.get_value("atlas_materials", entity_reference=context.scene)
+        and atlas_directory.startswith("//")
+        and not bpy.data.is_saved
+    ):
+        problems.append(
+            PreflightProblem(
+                armature.name, "Save the blend file or use an absolute atlas directory"
+            )
+        )
+    return problems
+
+
+def _get_shape_key_coordinates(shape_key):
+    coordinates = np.empty(len(shape_key.data) * 3, dtype=np.float32)
+    shape_key.data.foreach_get("co", coordinates)
+    return coordinates.reshape(-1, 3)
@@ -0,0 +1,22 @@
+from bpy.props import StringProperty
+from bpy.types import Operator
+from mpfb_to_unity.helpers import request_staged_job_cancel
+
+
+class CancelStagedJob(Operator):
+    bl_idname = "mtu.cancel_staged_job"
+    bl_label = "Cancel"
+    bl_options = {"INTERNAL"}
+
+    job: StringProperty(options={"HIDDEN"})
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def draw(self, context):
+        self.layout.label(text="Everything done since the job started will be undone,")
+        self.layout.label(text="including your own edits made while it was running.")
+
+    def execute(self, context):
+        request_staged_job_cancel(self.job)
+        return {"FINISHED"}
@@ -1,14 +1,18 @@
 import bpy
 from bpy.types import Operator
 from mpfb.services.objectservice import ObjectService
-from mpfb.services.rigifyhelpers.gameenginerigifyhelpers import GameEngineRigifyHelpers
-from mpfb.services.rigservice import RigService
 from mpfb_to_unity.utils import select_objects, change_mode_contextually, rename_object
 
-from mpfb_to_unity.helpers import DeformBonesHierarchyHelper
+from mpfb_to_unity.helpers import (
+    DeformBonesHierarchyHelper,
+    PreflightIndex,
+    StagedJob,
+    UnityRigifyHelpers,
+    get_job_object,
+)
 
 
-class ConvertToRigify(Operator):
+class ConvertToRigify(StagedJob, Operator):
     bl_idname = "mtu.convert_to_rigify"
     bl_label = "Convert"
     bl_options = {"REGISTER", "UNDO"}
@@ -17,19 +21,36 @@ class ConvertToRigify(Operator):
     def poll(cls, context):
         return ObjectService.object_is_skeleton(context.active_object)
 
-    def execute(self, context):
-        armature = context.active_object
-        basemesh = ObjectService.find_object_of_type_amongst_nearest_relatives(
-            context.active_object, "Basemesh"
-        )
+    def get_preflight_problems(self, context):
+        return PreflightIndex(context.active_object).check_convert_to_rigify()
+
+    def get_stages(self, context):
+        armature_name = context.active_object.name
+        return [
+            ("Convert to rigify", lambda context: self._convert_stage(context, armature_name)),
+            ("Simplify bones hierarchy", self._simplify_bones_hierarchy_stage),
+            (
+                "Disable IK stretching",
+                lambda _: self._disable_ik_stretching(get_job_object(self._rigify_name)),
+            ),
+            (
+                "Disable bones bending",
+                lambda _: self._disable_bones_bending(get_job_object(self._rigify_name)),
+            ),
+        ]
+
+    def _convert_stage(self, context, armature_name):
+        armature = get_job_object(armature_name)
+        self._basemesh_name = ObjectService.find_object_of_type_amongst_nearest_relatives(
+            armature, "Basemesh"
+        ).name
         select_objects(context, [armature])  # ensure it's the only object selected
-        rigify_armature = self._convert_to_rigify(context, armature, armature.name)
+        self._rigify_name = self._convert_to_rigify(context, armature, armature_name).name
 
+    def _simplify_bones_hierarchy_stage(self, context):
+        rigify_armature = get_job_object(self._rigify_name)
         select_objects(context, [rigify_armature])
-        self._simplify_bones_hierarchy(rigify_armature, basemesh)
-        self._disable_ik_stretching(rigify_armature)
-        self._disable_bones_bending(rigify_armature)
-        return {"FINISHED"}
+        self._simplify_bones_hierarchy(rigify_armature, get_job_object(self._basemesh_name))
 
     def _convert_to_rigify(self, context, armature, name):
         bpy.ops.object.transform_apply(location=True, scale=False, rotation=False)
@@ -41,7 +62,12 @@ class ConvertToRigify(Operator):
     def _simplify_bones_hierarchy(self, armature, mesh):
         with change_mode_contextually("EDIT"):
             helper = DeformBonesHierarchyHelper(armature.data.edit_bones)
-            _constraints_copy_queue = helper.simplify_hierarchy(armature, mesh)
+            problems = helper.validate(armature.name)
+            if not problems:
+                _constraints_copy_queue = helper.simplify_hierarchy(armature, mesh)
+
+        if problems:
+            raise Exception("; ".join(problem.message for problem in problems))
 
         for src_name, dst_name in _constraints_copy_queue:
             self._copy_constraints(armature, src_name, dst_name)
@@ -85,64 +111,3 @@ class ConvertToRigify(Operator):
             ]
         else:
             raise Exception(f"Unknown constraint type: {t}")
-
-
-class UnityRigifyHelpers(GameEngineRigifyHelpers):
-    def get_list_of_head_bones(self):
-        return ["neck_01", "head", "jaw", "eye_l", "eye_r"]
-
-    def get_list_of_connected_head_bones(self):
-        return ["neck_01", "head"]
-
-    def _setup_legs(self, armature_object):
-        for side in [True, False]:
-            leg = self.get_list_of_leg_bones(side)
-            self._set_use_connect_on_bones(armature_object, leg)
-            self._create_heel(armature_object, side)
-            bpy.ops.object.mode_set(mode="POSE", toggle=False)
-            first_leg_bone = RigService.find_pose_bone_by_name(leg[0], armature_object)
-            first_leg_bone.rigify_type = "limbs.leg"
-
-    def _setup_head(self, armature_object):
-        head = self.get_list_of_connected_head_bones()
-        self._set_use_connect_on_bones(armature_object, head)
-        bpy.ops.object.mode_set(mode="POSE", toggle=False)
-        first_head_bone = RigService.find_pose_bone_by_name(head[0], armature_object)
-        first_head_bone.rigify_type = "spines.super_head"
-        self._setup_face(armature_object)
-
-    def _setup_face(self, armature_object):
-        jaw_bone = RigService.find_pose_bone_by_name("jaw", armature_object)
-        jaw_bone.rigify_type = "basic.super_copy"
-        jaw_bone.rigify_parameters.super_copy_widget_type = "jaw"
-
-        for eye in ("eye_l", "eye_r"):
-            eye_bone = RigService.find_pose_bone_by_name(eye, armature_object)
-            eye_bone.rigify_type = "basic.super_copy"
-
-    def _create_heel(self, armature_object, left_side):
-        bpy.ops.object.mode_set(mode="EDIT", toggle=False)
-        suffix = "l" if left_side else "r"
-        bones = armature_object.data.edit_bones
-        foot = RigService.find_edit_bone_by_name(f"foot_{suffix}", armature_object)
-
-        heel = bones.new(f"heel_{suffix}")
-        heel.parent = foot
-        heel.use_connect = False
-
-        for joint in (heel.head, heel.tail):
-            joint.x = foot.head.x
-            joint.y = 0
-            joint.z = foot.tail.z
-
-        self._set_heel_width(heel, left_side)
-
-    def _set_heel_width(self, bone, left_side):
-        HEEL_WIDTH = 0.02
-        if left_side:
-            right, left = bone.head, bone.tail
-        else:
-            right, left = bone.tail, bone.head
-
-        right.x -= HEEL_WIDTH / 2
-        left.x += HEEL_WIDTH / 2
@@ -0,0 +1,199 @@
+import os
+import time
+
+import bpy
+from bpy.types import Operator, Scene
+from mpfb.entities.objectproperties import HumanObjectProperties
+from mpfb.services.blenderconfigset import BlenderConfigSet
+from mpfb.services.clothesservice import ClothesService
+from mpfb.services.targetservice import TargetService
+from mpfb_to_unity.helpers import (
+    PreflightIndex,
+    PreflightProblem,
+    RigifyRefitHelper,
+    StagedJob,
+    get_job_object,
+)
+from mpfb_to_unity.operators.bake_mesh import get_bake_preflight_problems
+from mpfb_to_unity.utils import change_mode_contextually, load_json, rename_object, select_objects
+
+CROWD_VARIANTS_PROPERTIES = BlenderConfigSet(
+    [
+        {
+            "name": "variants_file",
+            "label": "Variants file",
+            "description": "JSON list of variants, each with a name and MPFB macro values",
+            "type": "string",
+            "default": "",
+        },
+        {
+            "name": "output_directory",
+            "label": "Output directory",
+            "description": "Directory where FBX file of each variant is exported",
+            "type": "string",
+            "default": "//",
+        },
+    ],
+    Scene,
+    prefix="mtu_crowd_variants_",
+)
+
+# Suffix the bake gives to the objects it duplicates
+_BAKE_ORIGINAL_SUFFIX = "Original"
+
+
+class GenerateCrowdVariants(StagedJob, Operator):
+    """Export baked body shape variants of a rigify template, reusing its weights and rig"""
+
+    bl_idname = "mtu.generate_crowd_variants"
+    bl_label = "Generate variants"
+    bl_options = {"REGISTER", "UNDO"}
+
+    @classmethod
+    def poll(cls, context):
+        return context.active_object and context.active_object.type == "ARMATURE"
+
+    def get_preflight_problems(self, context):
+        armature = context.active_object
+        problems = PreflightIndex(armature).check_refit_rigify()
+        problems += get_bake_preflight_problems(context, armature)
+        output_directory = self._get_path(context, "output_directory")
+        if not os.path.isdir(output_directory):
+            problems.append(
+                PreflightProblem(armature.name, f"Output directory '{output_directory}' not found")
+            )
+        return problems + [
+            PreflightProblem(armature.name, message)
+            for message in _validate_variants_file(self._get_path(context, "variants_file"))
+        ]
+
+    def get_stages(self, context):
+        self._armature_name = context.active_object.name
+        self._basemesh_name = PreflightIndex(context.active_object).basemesh.name
+        self._output_directory = self._get_path(context, "output_directory")
+        self._durations = []
+
+        variants = load_json(self._get_path(context, "variants_file"))
+        macro_names = {name for variant in variants for name in variant["macros"]}
+        basemesh = get_job_object(self._basemesh_name)
+        self._template_macros = {
+            name: HumanObjectProperties.get_value(name, entity_reference=basemesh)
+            for name in macro_names
+        }
+
+        stages = [
+            (variant["name"], lambda context, v=variant: self._generate_variant(context, v))
+            for variant in variants
+        ]
+        stages.append(("Restore template", self._restore_template))
+        return stages
+
+    def _generate_variant(self, context, variant):
+        start = time.perf_counter()
+        try:
+            self._apply_macros(context, variant["macros"])
+            try:
+                self._bake_and_export(context, variant["name"])
+            finally:
+                self._remove_baked_copy()
+        except Exception:
+            # Scripts have no rollback, don't leave the template with variant macros
+            self._apply_macros(context, self._template_macros)
+            raise
+        self._durations.append(time.perf_counter() - start)
+
+    def _bake_and_export(self, context, name):
+        select_objects(context, [get_job_object(self._armature_name)])
+        if "FINISHED" not in bpy.ops.mtu.bake_mesh_for_unity():
+            raise Exception("Bake failed")
+
+        # The baked copy takes the template name
+        armature = get_job_object(self._armature_name)
+        # Rigify controls are not refitted, keep their constraints off the deform bones
+        armature.data.pose_position = "REST"
+        select_objects(context, [armature] + list(armature.children))
+        filepath = os.path.join(self._output_directory, f"{name}.fbx")
+        bpy.ops.mtu.export_unity_fbx(filepath=filepath, use_selection=True)
+
+    def _remove_baked_copy(self):
+        original = bpy.data.objects.get(f"{self._armature_name}{_BAKE_ORIGINAL_SUFFIX}")
+        if original is None:
+            return  # the bake failed before duplicating the template
+
+        baked = get_job_object(self._armature_name)
+        objects = [baked] + list(baked.children)
+        data = [obj.data for obj in objects if obj.data is not None and obj.data.users == 1]
+        bpy.data.batch_remove(objects + data)
+
+        for obj in [original] + list(original.children):
+            rename_object(obj, obj.name[: -len(_BAKE_ORIGINAL_SUFFIX)])
+            obj.hide_set(False)
+
+    def _restore_template(self, context):
+        self._apply_macros(context, self._template_macros)
+        if self._durations:
+            total = sum(self._durations)
+            self.report(
+                {"INFO"},
+                f"{len(self._durations)} variants in {total:.2f}s, "
+                f"{total / len(self._durations):.2f}s per variant",
+            )
+
+    def _apply_macros(self, context, macros):
+        armature = get_job_object(self._armature_name)
+        basemesh = get_job_object(self._basemesh_name)
+        for name, value in macros.items():
+            HumanObjectProperties.set_value(name, value, entity_reference=basemesh)
+        TargetService.reapply_macro_details(basemesh)
+
+        for obj in armature.children:
+            if obj.type == "MESH" and obj != basemesh:
+                ClothesService.fit_clothes_to_human(obj, basemesh)
+        self._refit_armature(context, armature, basemesh)
+
+    def _refit_armature(self, context, armature, basemesh):
+        # Edit mode applies to the active object, which must be the armature
+        select_objects(context, [armature])
+        with change_mode_contextually("EDIT"):
+            RigifyRefitHelper(armature, basemesh).refit()
+
+    def _get_path(self, context, name):
+        value = CROWD_VARIANTS_PROPERTIES.get_value(name, entity_reference=context.scene)
+        return bpy.path.abspath(value)
+
+
+def _validate_variants_file(filename):
+    if not os.path.isfile(filename):
+        return [f"Variants file '{filename}' not found"]
+    try:
+        variants = load_json(filename)
+    except ValueError as e:
+        return [f"Variants file is not valid JSON: {str(e)}"]
+    if not isinstance(variants, list) or not variants:
+        return ["Variants file must contain a non empty list of variants"]
+
+    problems = []
+    names = set()
+    for position, variant in enumerate(variants):
+        if not isinstance(variant, dict):
+            problems.append(f"Variant {position} is not an object")
+            continue
+        name = variant.get("name")
+        macros = variant.get("macros")
+        if not isinstance(name, str) or not name:
+            problems.append(f"Variant {position} has no name")
+        elif any(separator in name for separator in ("/", "\\")) or name in (".", ".."):
+            problems.append(f"Variant name '{name}' is not a valid file name")
+        elif name in names:
+            problems.append(f"Variant name '{name}' is used more than once")
+        names.add(name)
+        if not isinstance(macros, dict) or not all(
+            isinstance(value, (int, float)) and not isinstance(value, bool)
+            for value in macros.values()
+        ):
+            problems.append(f"Variant {position} macros must map names to numbers")
+            continue
+        for macro_name in macros:
+            if not HumanObjectProperties.has_key(macro_name):
+                problems.append(f"Variant {position} has unknown macro '{macro_name}'")
+    return problems
@@ -45,6 +45,11 @@ class ExportUnityFbx(Operator, ExportHelper):
         description="Export only objects from the active collection (and its children)",
         default=False,
     )
+    embed_textures: BoolProperty(
+        name="Embed Textures",
+        description="Embed textures, like baked atlases, in the FBX file",
+        default=False,
+    )
 
     def execute(self, context):
         if not self.filepath:
@@ -68,6 +73,8 @@ class ExportUnityFbx(Operator, ExportHelper):
             "use_tspace": False,  # Questionable
             "use_custom_props": True,
             "use_armature_deform_only": True,
+            "path_mode": "COPY" if self.embed_textures else "AUTO",
+            "embed_textures": self.embed_textures,
         }
 
         depsgraph = context.evaluated_depsgraph_get()
@@ -3,6 +3,7 @@ import os
 from bpy.types import Operator
 from mpfb.entities.rig import Rig
 from mpfb.services.objectservice import ObjectService
+from mpfb_to_unity.helpers import PreflightIndex, report_preflight_problems
 from mpfb_to_unity.utils import get_data_directory
 
 
@@ -17,6 +18,11 @@ class RefitArmatureToMesh(Operator):
 
     def execute(self, context):
         armature = context.active_object
+        problems = PreflightIndex(armature).check_refit()
+        if problems:
+            report_preflight_problems(self, problems)
+            return {"CANCELLED"}
+
         basemesh = ObjectService.find_object_of_type_amongst_nearest_relatives(armature, "Basemesh")
         data_dir = get_data_directory()
         rig_file = os.path.join(data_dir, "rig.json")
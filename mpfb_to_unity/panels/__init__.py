@@ -1,4 +1,5 @@
 from .bake_mesh import BakeMeshForUnityPanel
 from .convert_to_rigify import ConvertToRigifyPanel
+from .crowd_variants import GenerateCrowdVariantsPanel
 from .new_unity_human import NewUnityHumanPanel
 from .refit_armature_to_mesh import RefitArmatureToMeshPanel
@@ -1,5 +1,7 @@
 from bpy.types import Panel
 from mpfb.services.uiservice import UiService
+from mpfb_to_unity.helpers import draw_staged_job
+from mpfb_to_unity.operators.bake_mesh import BAKE_MESH_PROPERTIES
 
 
 class BakeMeshForUnityPanel(Panel):
@@ -12,4 +14,15 @@ class BakeMeshForUnityPanel(Panel):
     bl_options = {"DEFAULT_CLOSED"}
 
     def draw(self, context):
-        self.layout.operator("mtu.bake_mesh_for_unity")
+        BAKE_MESH_PROPERTIES.draw_properties(
+            context.scene,
+            self.layout,
+            [
+                "keep_shape_keys",
+                "shape_key_tolerance",
+                "atlas_materials",
+                "atlas_size",
+                "atlas_directory",
+            ],
+        )
+        draw_staged_job(self.layout, "mtu.bake_mesh_for_unity")
@@ -1,6 +1,7 @@
 from bpy.types import Panel
 from mpfb.services.objectservice import ObjectService
 from mpfb.services.uiservice import UiService
+from mpfb_to_unity.helpers import draw_staged_job
 
 
 class ConvertToRigifyPanel(Panel):
@@ -17,4 +18,4 @@ class ConvertToRigifyPanel(Panel):
         return ObjectService.object_is_skeleton(context.active_object)
 
     def draw(self, context):
-        self.layout.operator("mtu.convert_to_rigify")
+        draw_staged_job(self.layout, "mtu.convert_to_rigify")
@@ -0,0 +1,24 @@
+from bpy.types import Panel
+from mpfb.services.uiservice import UiService
+from mpfb_to_unity.helpers import draw_staged_job
+from mpfb_to_unity.operators.crowd_variants import CROWD_VARIANTS_PROPERTIES
+
+
+class GenerateCrowdVariantsPanel(Panel):
+    bl_idname = "MTU_PT_Generate_Crowd_Variants_Panel"
+    bl_label = "Generate crowd variants for Unity"
+    bl_space_type = "VIEW_3D"
+    bl_region_type = "UI"
+    bl_category = UiService.get_value("OPERATIONSCATEGORY")
+    bl_parent_id = "MPFB_PT_Operations_Panel"
+    bl_options = {"DEFAULT_CLOSED"}
+
+    @classmethod
+    def poll(cls, context):
+        return context.active_object and context.active_object.type == "ARMATURE"
+
+    def draw(self, context):
+        CROWD_VARIANTS_PROPERTIES.draw_properties(
+            context.scene, self.layout, ["variants_file", "output_directory"]
+        )
+        draw_staged_job(self.layout, "mtu.generate_crowd_variants")